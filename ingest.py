@@ -1,46 +1,64 @@
 import os
 import sqlite3
-import re
+import functools
+try:
+    import re2 as re  # Optional: `pip install google-re2` for linear-time (DFA) matching
+    DIGIT = r'\p{Nd}'  # RE2's \d is ASCII-only; \p{Nd} is what Python's str \d matches
+except ImportError:
+    import re
+    DIGIT = r'\d'
 from datetime import datetime
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 # --- CONFIGURATION ---
 # UPDATE THIS PATH to your folder containing the .txt files
 FOLDER_PATH = "."  # Use "." if running from inside the folder, or put the full path
 DB_PATH = "wati_chat_logs.db"
-
-# --- DATABASE SETUP ---
-if os.path.exists(DB_PATH):
-    os.remove(DB_PATH) # Start fresh
-
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
-
-# Enable Speed Mode
-c.execute("PRAGMA journal_mode=WAL;")
-c.execute("PRAGMA synchronous=NORMAL;")
-
-c.execute('''
-    CREATE TABLE IF NOT EXISTS messages (
-        filename TEXT,
-        sender TEXT,
-        message_body TEXT,
-        timestamp TEXT,
-        status TEXT
-    )
-''')
+BATCH_SIZE = 50000  # Rows bound per executemany call
+PARSE_WORKERS = None  # None = one per core; raise it if small-file reads, not parsing, are the bottleneck
+PARSE_WINDOW = 64  # Files per worker parsed ahead of the writer (bounds the rows held in memory)
 
 # --- PARSING LOGIC ---
+# Python's str \s (everything str.isspace() accepts), spelled out because RE2's \s is
+# ASCII-only: NBSP, \u2028, \x85 etc. must split stamps the same under both engines
+WHITESPACE = "\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+INLINE_WHITESPACE = WHITESPACE.replace("\n", "")  # [^\S\n]: whitespace that doesn't end the line
+
+# Regex to capture: Template "CONTENT" ...
+# We use (?s) (DOTALL) to allow (.) to match newlines. Compiled once, reused per block.
+# Inline flag instead of re.DOTALL so the same pattern works under both re and re2
+template_pattern = re.compile(rf'(?s)^Template[{WHITESPACE}]+"(.*?)"(?:[{WHITESPACE}]+was sent\.|$)')
+
+@functools.lru_cache(maxsize=4096)  # ~11 years of distinct days
+def iso_date(mdy):
+    """
+    MM/DD/YYYY -> YYYY-MM-DD through strptime, so impossible dates are rejected exactly as
+    before. Cached: a chat spans few distinct days. Returns None if strptime refuses it.
+    """
+    try:
+        return datetime.strptime(mdy, "%m/%d/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
 def process_message_block(filename, raw_timestamp, full_text):
     """
     Decides if a full block of text is a Template, User, or System message.
     """
     # 1. Standardize Time
-    try:
-        # Format: 09/26/2025 17:52:14
-        dt = datetime.strptime(raw_timestamp, "%m/%d/%Y %H:%M:%S")
-        iso_time = dt.strftime("%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        iso_time = raw_timestamp
+    # Format: 09/26/2025 17:52:14
+    # Fast path: fixed-width stamps are just re-sliced, strptime only for odd spacing
+    # (and for non-ASCII digits or out-of-range fields, which strptime rejects so the raw stamp is kept)
+    s = raw_timestamp
+    if (len(s) == 19 and s.isascii() and s[2] == '/' and s[5] == '/' and s[10] == ' '
+            and s[11:13] < "24" and s[14:16] < "60" and s[17:19] < "60" and (date := iso_date(s[:10]))):
+        iso_time = f"{date} {s[11:19]}"
+    else:
+        try:
+            dt = datetime.strptime(raw_timestamp, "%m/%d/%Y %H:%M:%S")
+            iso_time = dt.strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            iso_time = raw_timestamp
 
     # 2. Identify Sender
     clean_text = full_text.strip()
@@ -49,9 +67,7 @@ def process_message_block(filename, raw_timestamp, full_text):
     # We check startswith because templates can be huge and multi-line.
     if clean_text.startswith('Template "'):
         # Try to extract content inside quotes if possible, otherwise keep all
-        # Regex to capture: Template "CONTENT" ...
-        # We use DOTALL to allow (.) to match newlines
-        match = re.search(r'^Template\s+"(.*?)"(?:\s+was sent\.|$)', clean_text, re.DOTALL)
+        match = template_pattern.search(clean_text)
         if match:
             return (filename, 'Template', match.group(1), iso_time, 'sent')
         else:
@@ -60,11 +76,11 @@ def process_message_block(filename, raw_timestamp, full_text):
 
     # CASE B: User / Name (Contains ": ")
     # Format: "Anoop Pakki: It works" or "Shankar :): Thanks"
-    # We split ONLY on the FIRST ": " found.
-    if ": " in clean_text:
-        parts = clean_text.split(": ", 1)
-        sender_name = parts[0].strip()
-        body = parts[1].strip()
+    # We split ONLY on the FIRST ": " found (one find() scan, no `in` + split() list).
+    sep = clean_text.find(": ")
+    if sep != -1:
+        sender_name = clean_text[:sep].strip()
+        body = clean_text[sep + 2:].strip()
         
         # Cleanup: If sender is "Bot", treat appropriately (optional)
         return (filename, sender_name, body, iso_time, 'received')
@@ -72,77 +88,116 @@ def process_message_block(filename, raw_timestamp, full_text):
     # CASE C: System / Fallback
     return (filename, 'System', clean_text, iso_time, 'system')
 
-# --- MAIN LOOP ---
-print("🚀 Starting Smart Buffer Ingestion...")
-batch_data = []
-total_count = 0
-user_msg_count = 0
-
 # Regex to find start of message: [09/26/2025 17:52:14]
-timestamp_pattern = re.compile(r'^\[(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2})\]\s+(.*)')
-
-with os.scandir(FOLDER_PATH) as entries:
-    for entry in entries:
-        if entry.name.endswith(".txt") and "requirements" not in entry.name:
-            try:
-                with open(entry.path, "r", encoding="utf-8", errors="ignore") as f:
-                    
-                    # Buffer variables
-                    current_timestamp = None
-                    current_text_buffer = []
-                    
-                    for line in f:
-                        match = timestamp_pattern.match(line)
-                        
-                        if match:
-                            # 1. FOUND NEW MESSAGE -> SAVE PREVIOUS ONE
-                            if current_timestamp:
-                                full_msg = "\n".join(current_text_buffer)
-                                parsed = process_message_block(entry.name, current_timestamp, full_msg)
-                                if parsed:
-                                    batch_data.append(parsed)
-                                    if parsed[1] != 'Template': user_msg_count += 1
-
-                            # 2. START NEW BUFFER
-                            current_timestamp = match.group(1)
-                            current_text_buffer = [match.group(2).strip()] # Start with text after timestamp
-                            
-                        else:
-                            # CONTINUATION LINE (Append to current buffer)
-                            if current_timestamp:
-                                current_text_buffer.append(line.strip())
-
-                    # End of file: Save the last message in buffer
-                    if current_timestamp:
-                        full_msg = "\n".join(current_text_buffer)
-                        parsed = process_message_block(entry.name, current_timestamp, full_msg)
-                        if parsed:
-                            batch_data.append(parsed)
-                            if parsed[1] != 'Template': user_msg_count += 1
-
-                # Batch Insert to DB
-                if len(batch_data) >= 50000:
-                    c.executemany('INSERT INTO messages VALUES (?,?,?,?,?)', batch_data)
-                    conn.commit()
-                    total_count += len(batch_data)
-                    batch_data = []
-                    print(f"Processed {total_count} msgs... (Found {user_msg_count} non-templates)")
-
-            except Exception as e:
-                print(f"⚠️ Error reading {entry.name}: {e}")
-
-# Final Insert
-if batch_data:
-    c.executemany('INSERT INTO messages VALUES (?,?,?,?,?)', batch_data)
-    conn.commit()
+# Anchored at line starts ((?m)^) and never crossing a newline ([^\S\n]), so one
+# split() over the whole file yields [pre-matter, ts1, body1, ts2, body2, ...]
+# Like the old per-line `\s+`, the stamp needs trailing spaces or a newline: a bare
+# stamp as the file's last text stays a continuation line, not a new empty message
+timestamp_pattern = re.compile(
+    rf'(?m)^\[({DIGIT}{{2}}/{DIGIT}{{2}}/{DIGIT}{{4}}[{INLINE_WHITESPACE}]+{DIGIT}{{2}}:{DIGIT}{{2}}:{DIGIT}{{2}})\]'
+    rf'(?:[{INLINE_WHITESPACE}]+|\n)'
+)
+
+def parse_file(path):
+    """
+    Smart-buffer parse of one chat file into message rows.
+    Runs in a worker process, so it only reads the file and returns plain tuples.
+    """
+    filename = os.path.basename(path)
+    rows = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            parts = timestamp_pattern.split(f.read())
+
+        # parts[0] is anything before the first timestamp (ignored)
+        for i in range(1, len(parts), 2):
+            body = parts[i + 1]
+            # Continuation lines are stripped one by one, like the old line reader did
+            if "\n" in body:
+                body = "\n".join(line.strip() for line in body.split("\n"))
+            parsed = process_message_block(filename, parts[i], body)
+            if parsed:
+                rows.append(parsed)
 
-# --- INDEXING ---
-print("⏳ Building Indexes...")
-c.execute("CREATE INDEX IF NOT EXISTS idx_filename ON messages(filename);")
-c.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON messages(timestamp);")
-c.execute("CREATE INDEX IF NOT EXISTS idx_sender ON messages(sender);")
-conn.commit()
-conn.close()
+    except Exception as e:
+        print(f"⚠️ Error reading {filename}: {e}")
+
+    return rows
+
+def iter_rows(paths, stats):
+    """
+    Parses files across all cores and streams the rows back in file order,
+    so the single SQLite writer binds them without building a batch list first.
+    Non-template rows are counted into stats["user_msgs"] as they stream past.
+    """
+    workers = PARSE_WORKERS or os.cpu_count() or 1
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() submits everything it's given at once, so feed it one window at a time:
+        # parsing can't run more than a window ahead of the single writer
+        while window := list(islice(paths, PARSE_WINDOW * workers)):
+            for rows in executor.map(parse_file, window, chunksize=8):
+                stats["user_msgs"] += sum(1 for row in rows if row[1] != 'Template')
+                yield from rows
+
+if __name__ == "__main__":
+    # --- DATABASE SETUP ---
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH) # Start fresh
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    # Enable Speed Mode
+    c.execute("PRAGMA journal_mode=WAL;")
+    c.execute("PRAGMA synchronous=NORMAL;")
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            filename TEXT,
+            sender TEXT,
+            message_body TEXT,
+            timestamp TEXT,
+            status TEXT
+        )
+    ''')
+
+    # --- MAIN LOOP ---
+    print("🚀 Starting Smart Buffer Ingestion...")
+    total_count = 0
+    stats = {"user_msgs": 0}
+
+    with os.scandir(FOLDER_PATH) as entries:
+        paths = [entry.path for entry in entries if entry.name.endswith(".txt") and "requirements" not in entry.name]
+
+    rows = iter_rows(paths, stats)
+    while True:
+        # Batch Insert to DB: pull at most BATCH_SIZE rows off the generator per call
+        inserted = conn.executemany('INSERT INTO messages VALUES (?,?,?,?,?)', islice(rows, BATCH_SIZE)).rowcount
+        if inserted <= 0:
+            break
+        conn.commit()
+        total_count += inserted
+        print(f"Processed {total_count} msgs... (Found {stats['user_msgs']} non-templates)")
+
+    # --- INDEXING ---
+    # Strictly after the bulk load, so inserts never pay for index maintenance.
+    # (filename, timestamp) serves per-chat history ordered by time and also
+    # covers plain filename lookups, so no separate idx_filename.
+    print("⏳ Building Indexes...")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_file_ts ON messages(filename, timestamp);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON messages(timestamp);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sender ON messages(sender);")
+    c.execute("ANALYZE;")  # Give the query planner stats for the new indexes
+
+    # Full-text index for body/filename search (MATCH instead of LIKE '%term%' scans).
+    # External-content table: no second copy of the text, filled in one pass after the load.
+    # content="messages" is double-quoted so Datasette auto-detects it for its search box.
+    print("⏳ Building Search Index...")
+    c.execute('CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(message_body, filename, content="messages", content_rowid="rowid");')
+    c.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild');")
+    conn.commit()
+    conn.close()
 
-print(f"✅ DONE! Total Messages: {total_count + len(batch_data)}")
-print(f"✅ User/Human Messages Found: {user_msg_count}")
\ No newline at end of file
+    print(f"✅ DONE! Total Messages: {total_count}")
+    print(f"✅ User/Human Messages Found: {stats['user_msgs']}")
\ No newline at end of file
@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from pymongo import MongoClient
 from datetime import datetime, timedelta, time
-import hashlib
+import zlib
+import functools
+import re
 import base64
+import html
+import uuid
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="Rocket Health QA Dashboard")
@@ -14,14 +19,37 @@ st.markdown("""
     /* GLOBAL CLEANUP */
     .stChatFloatingInputContainer { bottom: 20px; }
     
+    /* Whole thread is emitted as one HTML blob: one row per message */
+    .chat-thread { display: flex; flex-direction: column; gap: 12px; }
+    .chat-row { display: flex; align-items: flex-start; gap: 10px; }
+    .chat-avatar {
+        width: 36px;
+        height: 36px;
+        border-radius: 50%;
+        flex-shrink: 0;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 1.3rem;
+    }
+    .chat-bubble {
+        padding: 10px 14px;
+        max-width: 75%;
+        overflow-wrap: anywhere;
+    }
+    .chat-time {
+        font-size: 0.7rem;
+        opacity: 0.7;
+        margin-top: 4px;
+    }
+
     /* === 1. TEAM & BOT MESSAGES (RIGHT SIDE) === */
     /* Container: Flips avatar to the right */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="assistant"]) {
+    .chat-row.staff {
         flex-direction: row-reverse;
-        text-align: right;
     }
     /* Bubble Styling */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="assistant"]) .stChatMessageContent {
+    .chat-row.staff .chat-bubble {
         background: linear-gradient(135deg, #005a9e 0%, #004170 100%); /* Professional Blue Gradient */
         color: #ffffff;
         border-radius: 12px 2px 12px 12px; /* Sharp top-right corner */
@@ -31,7 +59,7 @@ st.markdown("""
         min-width: 200px;
     }
     /* Sender Name Styling (Inside Bubble) */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="assistant"]) .sender-name {
+    .chat-row.staff .sender-name {
         font-size: 0.75rem;
         color: #a6d5fa; /* Light Blue for name */
         font-weight: bold;
@@ -42,12 +70,8 @@ st.markdown("""
     }
 
     /* === 2. PATIENT MESSAGES (LEFT SIDE) === */
-    /* Container: Standard Left Alignment */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="user"]) {
-        flex-direction: row;
-    }
     /* Bubble Styling */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="user"]) .stChatMessageContent {
+    .chat-row.patient .chat-bubble {
         background-color: #2b2d31; /* Dark Grey (Discord-like) */
         color: #e0e0e0;
         border-radius: 2px 12px 12px 12px; /* Sharp top-left corner */
@@ -56,7 +80,7 @@ st.markdown("""
         min-width: 200px; /* Ensure wide enough for name */
     }
     /* Sender Name Styling (Inside Bubble) */
-    .stChatMessage[data-testid="stChatMessage"]:has(div[aria-label="user"]) .sender-name {
+    .chat-row.patient .sender-name {
         font-size: 0.75rem;
         color: #b0b0b0; /* Dim grey for name */
         font-weight: bold;
@@ -103,27 +127,97 @@ except:
 @st.cache_resource
 def get_collection():
     try:
-        client = MongoClient(MONGO_URI)
+        # One pooled client per server process; dashboard reads may come from secondaries.
+        # zstd needs PyMongo's optional zstd extra installed, otherwise it falls back to zlib.
+        client = MongoClient(
+            MONGO_URI,
+            maxPoolSize=50,
+            minPoolSize=5,
+            readPreference="secondaryPreferred",
+            compressors="zstd,zlib",
+        )
         client.admin.command('ping')
         return client["wati_logs"]["messages"]
     except Exception as e:
         st.error(f"❌ Connection Error: {e}")
         st.stop()
 
+# Index specs the dashboard queries rely on
+DASHBOARD_INDEXES = [
+    # Text index backs the search box ($text), so it never has to regex-scan every message
+    ([("message_body", "text"), ("filename", "text")], {"name": "search_text"}),
+    # (filename, timestamp desc) lets $group take $first straight off the index order;
+    # timestamp desc serves the date-range match
+    ([("filename", 1), ("timestamp", -1)], {}),
+    ([("timestamp", -1)], {}),
+    # distinct("sender") becomes a DISTINCT_SCAN over this index instead of a collection scan;
+    # the teammate filter's distinct("filename", {"sender": ...}) is covered by it too
+    ([("sender", 1), ("filename", 1)], {}),
+]
+
+@st.cache_resource
+def ensure_indexes(_coll):
+    """Creates the dashboard indexes once per server process (no-op if they exist).
+    Failures (read-only user, a conflicting text index, ...) only warn: the dashboard still runs, just slower.
+    Returns (failures, whether a text index exists for $text search)."""
+    failed = []
+    for keys, options in DASHBOARD_INDEXES:
+        try:
+            _coll.create_index(keys, **options)
+        except Exception as e:
+            failed.append(f"{options.get('name', keys)}: {e}")
+
+    # $text raises without a text index, so check what is actually there (ours or a pre-existing one)
+    try:
+        has_text_index = any(
+            kind == "text" for spec in _coll.index_information().values() for _, kind in spec["key"]
+        )
+    except Exception:
+        has_text_index = False
+    return failed, has_text_index
+
 collection = get_collection()
+index_errors, text_search_ready = ensure_indexes(collection)
+if index_errors:
+    st.warning("⚠️ Could not create some indexes, queries may be slow:\n\n" + "\n\n".join(index_errors))
+if not text_search_ready:
+    st.warning("⚠️ No text index on messages: search falls back to a slower substring scan.")
 
-@st.cache_data(ttl=3600)
-def get_all_senders():
-    """Fetches all unique senders from the DB to populate filters dynamically."""
+# Cached DB reads take a `db_epoch` argument that is only part of the cache key: "🔄 Refresh Data"
+# sets st.session_state.db_epoch to a fresh random token, so that session refetches without wiping
+# every other session's cache (and can never land on an entry another session cached)
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_all_senders(db_epoch=0):
+    """Fetches all unique senders from the DB to populate filters dynamically (immutable tuple)."""
     senders = collection.distinct("sender")
-    return [s for s in senders if s and s not in ["Template", "System", "Bot"]]
+    return tuple(s for s in senders if s and s not in ("Template", "System", "Bot"))
+
+# Senders matching these are bots in the chat view (hidden unless "Show System" is on)
+BOT_SENDER_RE = re.compile("Template|System|Bot")
+# Auto-selected as staff in the sidebar (bots plus Rocket accounts)
+STAFF_SENDER_RE = re.compile("Template|System|Rocket|Bot")
+# Every CommonMark line ending (\r\n, lone \r, \n): any of them left raw can form the blank
+# line that ends the chat's HTML block, so all become <br>
+LINE_BREAK_RE = re.compile(r"\r\n?|\n")
+
+MIN_SEARCH_LEN = 3  # Shorter searches don't hit the DB (no query per first keystrokes)
+PREVIEW_CHARS = 120  # Message previews in the conversation table are cut to this length
 
+def normalize_search(term):
+    """Collapses case/whitespace variants of a search so they share one cache entry."""
+    return re.sub(r"\s+", " ", term.strip().lower()) if term else ""
+
+def derive_phone(filenames):
+    """Vectorized phone number from chat filenames ('<phone>-<rest>.txt'), all in pandas' C string ops."""
+    return filenames.str.removesuffix('.txt').str.split('-', n=1).str[0]
+
+@functools.lru_cache(maxsize=4096)
 def get_color_for_name(name):
     """Generates a consistent color based on the name string."""
     colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#FFA07A", "#98D8C8", "#F7DC6F", "#BB8FCE", "#F1948A", "#5DADE2"]
-    hash_val = int(hashlib.sha256(name.encode('utf-8')).hexdigest(), 16)
-    return colors[hash_val % len(colors)]
+    return colors[zlib.crc32(name.encode('utf-8')) % len(colors)]
 
+@functools.lru_cache(maxsize=4096)
 def create_avatar_svg(initial, color):
     """Creates a custom SVG avatar with the specific assigned color."""
     svg = f"""
@@ -135,9 +229,79 @@ def create_avatar_svg(initial, color):
     b64 = base64.b64encode(svg.encode('utf-8')).decode("utf-8")
     return f"data:image/svg+xml;base64,{b64}"
 
+@st.cache_data(show_spinner=False)
+def render_staff_badges(staff_names):
+    """Colored team badges for the sidebar, built in one join and cached per selection."""
+    badges = "".join(
+        f"<span class='team-badge' style='background-color:{get_color_for_name(name)}'>"
+        f"{html.escape(name.split()[0] if ' ' in name else name)}</span>"
+        for name in staff_names
+    )
+    return f"<div style='margin-bottom: 20px;'>{badges}</div>"
+
+def render_chat_html(chat_df, staff_list, show_system):
+    """Builds the whole chat thread as one HTML string, so it ships to the browser in a single element."""
+    chat_df = (
+        chat_df.reindex(columns=['sender', 'message_body', 'timestamp'])
+        .fillna({'sender': 'System', 'message_body': ''})
+        .astype({'sender': str})  # .str needs string values, even on an empty frame
+    )
+
+    # Classify every message in two vectorized passes instead of per-row checks
+    is_bot = chat_df['sender'].str.contains(BOT_SENDER_RE, na=False)
+
+    # FILTER up front, so date headers are computed on the rows actually shown
+    if not show_system:
+        chat_df = chat_df[~is_bot]
+        is_bot = is_bot[~is_bot]
+
+    # Staff = selected staff list OR a bot
+    is_staff = (is_bot | chat_df['sender'].isin(staff_list)).to_numpy()
+
+    # Date headers in one vectorized pass: a row opens a new day when its date differs
+    # from the last known date above it (NaT rows get no header and don't reset it)
+    ts = pd.to_datetime(chat_df['timestamp'], errors='coerce')
+    days = ts.dt.normalize()
+    new_day = (days.notna() & days.ne(days.ffill().shift())).to_numpy()
+    day_labels = ts.dt.strftime('%B %d, %Y').to_numpy()
+    time_strs = ts.dt.strftime('%H:%M').fillna('').to_numpy()
+
+    html_parts = ["<div class='chat-thread'>"]
+
+    for sender, msg, staff, is_new_day, day_label, time_str in zip(
+        chat_df['sender'].to_numpy(), chat_df['message_body'].to_numpy(), is_staff, new_day, day_labels, time_strs
+    ):
+        # 1. DATE HEADER
+        if is_new_day:
+            html_parts.append(f"<div class='date-separator'><span>{day_label}</span></div>")
+
+        # 2. ASSIGN VISUALS
+        if staff:
+            row_class = "staff"
+            assigned_color = get_color_for_name(sender)
+            initial = sender[0].upper() if sender else "R"
+            avatar = f"<img class='chat-avatar' src='{create_avatar_svg(initial, assigned_color)}'/>"
+        else:
+            row_class = "patient"
+            avatar = "<div class='chat-avatar'>👤</div>"
+
+        # 3. BUBBLE (escaped, line endings as <br> so a blank line can't end the HTML block)
+        body = LINE_BREAK_RE.sub("<br>", html.escape(str(msg)))
+        name = LINE_BREAK_RE.sub("<br>", html.escape(sender))
+        html_parts.append(
+            f"<div class='chat-row {row_class}'>{avatar}<div class='chat-bubble'>"
+            f"<span class='sender-name'>{name}</span>{body}"
+            f"<div class='chat-time'>{time_str}</div></div></div>"
+        )
+
+    html_parts.append("</div>")
+    return "".join(html_parts)
+
 # --- 4. DATA LOGIC ---
 
-def get_data_qa(limit, search_term, hide_templates, staff_list, filter_teammate, patient_mode_on, date_range):
+@st.cache_data(ttl=300)
+def get_data_qa(limit, search_term, hide_templates, staff_list, filter_teammate, patient_mode_on, date_range, db_epoch=0):
+    """Cached per normalized query: pass normalize_search() output and a sorted staff tuple."""
     match_stage = {}
     
     start_dt = datetime.combine(date_range[0], time.min)
@@ -148,24 +312,33 @@ def get_data_qa(limit, search_term, hide_templates, staff_list, filter_teammate,
         match_stage["sender"] = {"$ne": "Template"}
 
     if search_term:
-        match_stage["$or"] = [
-            {"filename": {"$regex": search_term, "$options": "i"}},
-            {"message_body": {"$regex": search_term, "$options": "i"}}
-        ]
+        if search_term.lstrip("+").isdigit():
+            # Phone numbers live in the filename: match any part of it (with or without country code).
+            # Unanchored, but it only scans filename index keys, never message bodies
+            match_stage["filename"] = {"$regex": re.escape(search_term.lstrip('+'))}
+        elif text_search_ready:
+            # Word search goes through the text index instead of an unanchored $regex scan.
+            # Quoted as a phrase so "john doe" keeps meaning the words together, not john OR doe
+            match_stage["$text"] = {"$search": '"' + search_term.replace('"', ' ') + '"'}
+        else:
+            # No text index to use: case-insensitive substring match on filename or body
+            pattern = {"$regex": re.escape(search_term), "$options": "i"}
+            match_stage["$or"] = [{"filename": pattern}, {"message_body": pattern}]
 
     if filter_teammate:
         touched_files = collection.distinct("filename", {"sender": filter_teammate})
-        match_stage["filename"] = {"$in": touched_files}
+        match_stage.setdefault("filename", {})["$in"] = touched_files
 
     if patient_mode_on and staff_list:
         if "sender" in match_stage and isinstance(match_stage["sender"], dict):
-            match_stage["sender"]["$nin"] = staff_list
+            match_stage["sender"]["$nin"] = list(staff_list)
         else:
-            match_stage["sender"] = {"$nin": staff_list}
+            match_stage["sender"] = {"$nin": list(staff_list)}
 
     pipeline = [
         {"$match": match_stage},
-        {"$sort": {"timestamp": -1}},
+        # Matches the (filename, timestamp desc) index, so no full in-memory sort before $group
+        {"$sort": {"filename": 1, "timestamp": -1}},
         {"$group": {
             "_id": "$filename",
             "last_msg": {"$first": "$message_body"},
@@ -177,21 +350,70 @@ def get_data_qa(limit, search_term, hide_templates, staff_list, filter_teammate,
         {"$limit": limit}
     ]
     
-    results = list(collection.aggregate(pipeline))
+    # Grouped output is at most `limit` docs: fetch it in a single batch
+    results = list(collection.aggregate(pipeline, batchSize=limit))
     if not results: return pd.DataFrame()
         
-    df = pd.DataFrame(results)
+    # Fixed column list: no per-row dtype/column inference
+    df = pd.DataFrame.from_records(results, columns=["_id", "last_msg", "last_sender", "last_active", "msg_count"])
     df.rename(columns={"_id": "filename", "last_msg": "preview"}, inplace=True)
-    df['Phone'] = df['filename'].apply(lambda x: x.split('-')[0] if '-' in x else x)
-    return df
+    df['last_active'] = pd.to_datetime(df['last_active'], errors='coerce')
+    df['Phone'] = derive_phone(df['filename'])
+    # Slimmer dtypes for the frame st.cache_data keeps per query: a handful of senders repeat across rows
+    return df.astype({'msg_count': 'uint32', 'last_sender': 'category'})
+
+CHAT_PAGE_SIZE = 50  # Messages fetched and rendered per page; "Load older" adds a page
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_chat_history(filename, limit=CHAT_PAGE_SIZE, include_system=False, db_epoch=0):
+    """Newest `limit` messages of a chat (bots filtered server-side unless asked for), oldest first."""
+    query = {"filename": filename}
+    if not include_system:
+        query["sender"] = {"$not": BOT_SENDER_RE}
 
-def get_chat_history(filename):
-    return pd.DataFrame(list(collection.find({"filename": filename}).sort("timestamp", 1)))
+    # Only the fields the chat renderer reads (no _id); newest-first walk of the
+    # (filename, timestamp desc) index, stopping after `limit` docs
+    cursor = collection.find(
+        query,
+        projection={"_id": 0, "sender": 1, "message_body": 1, "timestamp": 1},
+    ).sort("timestamp", -1).limit(limit).batch_size(limit)
+    chat_df = pd.DataFrame.from_records(cursor, columns=["sender", "message_body", "timestamp"])
+    chat_df = chat_df.iloc[::-1].reset_index(drop=True)
+    chat_df['timestamp'] = pd.to_datetime(chat_df['timestamp'], errors='coerce')
+    return chat_df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_chat_html(filename, limit, include_system, staff_names, db_epoch=0):
+    """Rendered chat thread plus its message count; reruns that change nothing skip the fetch and the render loop."""
+    chat_df = get_chat_history(filename, limit, include_system, db_epoch)
+    return render_chat_html(chat_df, staff_names, include_system), len(chat_df)
 
 # --- 5. UI LAYOUT ---
 
 if 'view_mode' not in st.session_state: st.session_state.view_mode = "list"
 if 'selected_file' not in st.session_state: st.session_state.selected_file = None
+if 'db_epoch' not in st.session_state: st.session_state.db_epoch = 0
+
+def load_older_messages():
+    st.session_state.chat_limit = st.session_state.get("chat_limit", CHAT_PAGE_SIZE) + CHAT_PAGE_SIZE
+
+@st.fragment
+def render_chat(filename, staff_list):
+    """Chat bubbles plus their own controls: toggling them reruns only this fragment, not the sidebar or list queries."""
+    show_system = st.checkbox("Show System/Template Messages", value=False)
+    chat_limit = st.session_state.get("chat_limit", CHAT_PAGE_SIZE)
+    chat_html, n_messages = get_chat_html(
+        filename, chat_limit, show_system, tuple(sorted(staff_list)), st.session_state.db_epoch
+    )
+
+    # A full window means there may be more history above it.
+    # The callback bumps the window before the fragment reruns, so no extra st.rerun().
+    if n_messages >= chat_limit:
+        st.button("⬆️ Load older messages", on_click=load_older_messages)
+    
+    chat_container = st.container()
+    with chat_container:
+        st.markdown(chat_html, unsafe_allow_html=True)
 
 # === SIDEBAR ===
 with st.sidebar:
@@ -209,17 +431,18 @@ with st.sidebar:
     # --- HARDCODED STAFF LIST ---
     st.caption("👥 **Identify Staff Members**")
     
-    all_senders = get_all_senders()
+    all_senders = get_all_senders(st.session_state.db_epoch)
     
     # 1. System/Bots (Auto-detected)
-    system_bots = [s for s in all_senders if any(k in s for k in ["Template", "System", "Rocket", "Bot"])]
+    system_bots = [s for s in all_senders if STAFF_SENDER_RE.search(s)]
     
     # 2. YOUR HARDCODED TEAM (Exact names)
     manual_team = ["Hamood .", "Moomal Kumari", "Shankar :)", "Apoorva Nair"]
     
     # 3. Combine both for the default selection
-    # We use set() to avoid duplicates if a name appears in both lists
-    default_staff = list(set(system_bots + [m for m in manual_team if m in all_senders]))
+    # dict.fromkeys drops duplicates but, unlike set(), keeps a stable order across reruns
+    all_senders_set = set(all_senders)
+    default_staff = list(dict.fromkeys([*system_bots, *(m for m in manual_team if m in all_senders_set)]))
     
     staff_list = st.multiselect(
         "Select Team/Bots (to distinguish from patients):", 
@@ -228,20 +451,14 @@ with st.sidebar:
     )
     
     if staff_list:
-        html_badges = "<div style='margin-bottom: 20px;'>"
-        for name in staff_list:
-            color = get_color_for_name(name)
-            display_name = name.split()[0] if " " in name else name
-            html_badges += f"<span class='team-badge' style='background-color:{color}'>{display_name}</span>"
-        html_badges += "</div>"
-        st.markdown(html_badges, unsafe_allow_html=True)
+        st.markdown(render_staff_badges(tuple(staff_list)), unsafe_allow_html=True)
     
     st.markdown("---")
     limit = st.slider("Rows to load", 50, 500, 100)
     hide_tmps = st.checkbox("Hide Templates", value=True)
     
     if st.button("🔄 Refresh Data"):
-        st.cache_data.clear()
+        st.session_state.db_epoch = uuid.uuid4().hex
         st.rerun()
 
 # === VIEW 1: LIST ===
@@ -251,6 +468,8 @@ if st.session_state.view_mode == "list":
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
         search = st.text_input("🔍 Search User...", placeholder="Phone, Name, or Message content")
+        if 0 < len(search.strip()) < MIN_SEARCH_LEN:
+            st.caption(f"Type at least {MIN_SEARCH_LEN} characters to search.")
     with col2:
         teammate_options = ["All"] + staff_list
         selected_teammate = st.selectbox("👮 Filter by Teammate", teammate_options)
@@ -260,19 +479,31 @@ if st.session_state.view_mode == "list":
         st.caption("Showing *Patient* msgs only" if patient_mode else "Showing *Absolute* last msg")
 
     with st.spinner("Crunching QA numbers..."):
-        df = get_data_qa(limit, search, hide_tmps, staff_list, filter_tm, patient_mode, (start_date, end_date))
+        search_term = normalize_search(search)
+        if len(search_term) < MIN_SEARCH_LEN:
+            search_term = ""
+        df = get_data_qa(
+            limit, search_term, hide_tmps, tuple(sorted(staff_list)),
+            filter_tm, patient_mode, (start_date, end_date), st.session_state.db_epoch
+        )
 
     if df.empty:
         st.info("No conversations found.")
     else:
-        def get_status_badge(count):
-            return "🆕 New Lead" if count <= 5 else "🔄 Recurring"
-        df['Status'] = df['msg_count'].apply(get_status_badge)
+        df['Status'] = np.where(df['msg_count'].to_numpy() <= 5, "🆕 New Lead", "🔄 Recurring")
 
         st.write(f"Found **{len(df)}** active conversations.")
         
+        # Row-click lookups read plain arrays instead of building a Series per df.iloc[index]
+        files = df['filename'].to_numpy()
+        phones = df['Phone'].to_numpy()
+
+        # Ship only the displayed columns, with previews capped, so the Arrow payload stays small
+        display_df = df[['Status', 'Phone', 'last_sender', 'preview', 'last_active']].copy()
+        display_df['preview'] = display_df['preview'].str.slice(0, PREVIEW_CHARS)
+
         event = st.dataframe(
-            df[['Status', 'Phone', 'last_sender', 'preview', 'last_active']],
+            display_df,
             column_config={
                 "Status": st.column_config.TextColumn("Type", width="small"),
                 "Phone": st.column_config.TextColumn("User / Phone", width="medium"),
@@ -289,8 +520,9 @@ if st.session_state.view_mode == "list":
         
         if len(event.selection.rows) > 0:
             index = event.selection.rows[0]
-            st.session_state.selected_file = df.iloc[index]['filename']
-            st.session_state.clean_phone = df.iloc[index]['Phone']
+            st.session_state.selected_file = files[index]
+            st.session_state.clean_phone = phones[index]
+            st.session_state.chat_limit = CHAT_PAGE_SIZE
             st.session_state.view_mode = "chat"
             st.rerun()
 
@@ -303,50 +535,5 @@ elif st.session_state.view_mode == "chat":
             st.rerun()
     with col2:
         st.subheader(f"💬 {st.session_state.clean_phone}")
-    
-    chat_df = get_chat_history(st.session_state.selected_file)
-    show_system = st.checkbox("Show System/Template Messages", value=False)
-    
-    chat_container = st.container()
-    with chat_container:
-        prev_date = None
-        
-        for _, row in chat_df.iterrows():
-            sender = row.get('sender', 'System')
-            msg = row.get('message_body', '')
-            ts = row.get('timestamp', '')
-            
-            # 1. IDENTIFY ROLE (Dynamic Logic)
-            is_bot = any(k in sender for k in ["Template", "System", "Bot"])
-            # Check if in selected staff list OR is a bot
-            is_staff = sender in staff_list or is_bot
-            
-            # FILTER
-            if is_bot and not show_system:
-                continue
-
-            # 2. DATE HEADER
-            if isinstance(ts, datetime):
-                msg_date = ts.date()
-                if msg_date != prev_date:
-                    st.markdown(f"<div class='date-separator'><span>{msg_date.strftime('%B %d, %Y')}</span></div>", unsafe_allow_html=True)
-                    prev_date = msg_date
-                time_str = ts.strftime("%H:%M")
-            else:
-                time_str = ""
-
-            # 3. ASSIGN VISUALS
-            if is_staff:
-                role = "assistant"
-                assigned_color = get_color_for_name(sender)
-                initial = sender[0].upper() if sender else "R"
-                avatar_icon = create_avatar_svg(initial, assigned_color)
-            else:
-                role = "user"
-                avatar_icon = "👤"
-
-            # 4. RENDER BUBBLE
-            with st.chat_message(role, avatar=avatar_icon):
-                st.markdown(f"<span class='sender-name'>{sender}</span>", unsafe_allow_html=True)
-                st.write(msg)
-                st.caption(time_str)
\ No newline at end of file
+
+    render_chat(st.session_state.selected_file, staff_list)